@@ -5,14 +5,23 @@ No database, no complexity, just profit
 """
 
 import os
+import sys
+import math
 import time
-import json
+import queue
+import hashlib
+import asyncio
 import threading
+import multiprocessing
 from datetime import datetime
-from collections import defaultdict, deque
+from collections import defaultdict
+
+import numpy as np
+import orjson
+from numba import njit, prange, set_num_threads
 
 # Flask for web dashboard
-from flask import Flask, render_template_string
+from flask import Flask
 
 # Binance API
 import ccxt
@@ -35,15 +44,55 @@ class Config:
     MIN_PROFIT = float(os.getenv('MIN_PROFIT', '0.3'))
     
     # Scanning
-    SCAN_INTERVAL = float(os.getenv('SCAN_INTERVAL', '0.3'))
+    SCAN_COALESCE = float(os.getenv('SCAN_COALESCE', '0.005'))  # Window to batch OB updates
+    SCAN_MIN_GAP = float(os.getenv('SCAN_MIN_GAP', '0.001'))    # Minimum time between scans
     MAX_SYMBOLS = int(os.getenv('MAX_SYMBOLS', '100'))
     MAX_TRIANGLES = int(os.getenv('MAX_TRIANGLES', '500'))
+    MAX_CYCLE_HOPS = int(os.getenv('MAX_CYCLE_HOPS', '5'))  # Longest loop find_cycle looks for
+    TRIANGLE_CACHE = os.getenv('TRIANGLE_CACHE', './triangles.cache')
+    
+    # Orderbook streams
+    STREAMS_PER_CONNECTION = int(os.getenv('STREAMS_PER_CONNECTION', '200'))
+    TS_DELTA_CONSECUTIVE_MS = float(os.getenv('TS_DELTA_CONSECUTIVE_MS', '1000'))  # Max book age
+    
+    # CPU pinning (boot with isolcpus= on these cores); empty disables
+    SCAN_CORE = int(os.getenv('SCAN_CORE')) if os.getenv('SCAN_CORE') else None
+    OB_CORE = int(os.getenv('OB_CORE')) if os.getenv('OB_CORE') else None
+    RT_PRIORITY = int(os.getenv('RT_PRIORITY', '0'))  # SCHED_FIFO priority, 0 = nice -10 instead
+    
+    # Console
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
     
     # Web
     WEB_PORT = int(os.getenv('WEB_PORT', '5000'))
 
 config = Config()
 
+# ==================== CONSOLE LOG ====================
+log_q = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+
+def log(msg=''):
+    """Queue a console line for the log thread; dropped if the queue is full"""
+    try:
+        log_q.put_nowait(msg)
+    except queue.Full:
+        pass
+
+def log_writer():
+    """Write queued console lines off the hot path"""
+    while True:
+        msg = log_q.get()
+        try:
+            sys.stdout.write(f"{msg}\n")
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            pass  # Console gone; keep draining so flush_log() returns
+        log_q.task_done()
+
+def flush_log():
+    """Block until every queued line has been written"""
+    log_q.join()
+
 # ==================== EXCHANGE SETUP ====================
 def init_exchange():
     """Initialize Binance exchange"""
@@ -65,191 +114,746 @@ def init_exchange():
             }
         })
         exchange.set_sandbox_mode(True)
-        print("🔧 Using Binance TESTNET")
+        log("🔧 Using Binance TESTNET")
     else:
         exchange = ccxt.binance(exchange_params)
-        print("🚀 Using Binance LIVE")
+        log("🚀 Using Binance LIVE")
     
-    print(f"💼 Trade Amount: ${config.TRADE_AMOUNT}")
-    print(f"🎯 Min Profit: {config.MIN_PROFIT}%")
-    print(f"📊 Dry Run: {config.DRY_RUN}")
+    log(f"💼 Trade Amount: ${config.TRADE_AMOUNT}")
+    log(f"🎯 Min Profit: {config.MIN_PROFIT}%")
+    log(f"📊 Dry Run: {config.DRY_RUN}")
     
     return exchange
 
+def pin_current_thread(core, label):
+    """Pin the calling thread to a dedicated core and raise its priority (Linux)"""
+    if core is None:
+        return
+    
+    try:
+        os.sched_setaffinity(0, {core})
+        log(f"📌 {label} pinned to core {core}")
+    except (AttributeError, OSError) as e:
+        log(f"⚠️  Could not pin {label} to core {core}: {e}")
+    
+    try:
+        if config.RT_PRIORITY > 0:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(config.RT_PRIORITY))
+            log(f"📌 {label} running SCHED_FIFO at priority {config.RT_PRIORITY}")
+        else:
+            os.nice(-10)
+            log(f"📌 {label} niced to -10")
+    except (AttributeError, OSError) as e:
+        log(f"⚠️  Could not raise {label} priority: {e}")
+
 # ==================== SIMPLE ORDERBOOK ====================
+BOOK_DEPTH = 10  # Levels kept per side
+
+# Taker fee (0.1%), applied once per path instead of once per leg
+FEE_RATE = 0.999
+TRIANGLE_FEE = FEE_RATE ** 3          # 0.997002999
+LOG_FEE_WEIGHT = -math.log(FEE_RATE)  # Added to every Bellman-Ford edge
+
+def _edge_weights(bid_p, ask_p):
+    """Bellman-Ford weights -log(rate) - log(fee) for selling and buying at top of book"""
+    sell_weight = -math.log(bid_p[0]) + LOG_FEE_WEIGHT if bid_p[0] > 0 else math.inf
+    buy_weight = math.log(ask_p[0]) + LOG_FEE_WEIGHT if ask_p[0] > 0 else math.inf
+    return sell_weight, buy_weight
+
+def _write_levels(prices, volumes, levels):
+    """Overwrite preallocated price/volume rows in place, zero-padding the tail"""
+    n = min(len(levels), BOOK_DEPTH)
+    for i in range(n):
+        prices[i] = float(levels[i][0])
+        volumes[i] = float(levels[i][1])
+    prices[n:] = 0.0
+    volumes[n:] = 0.0
+
 class SimpleOrderBook:
-    """Simple orderbook storage"""
+    """Simple orderbook storage, indexed by pair id
+    
+    The writer overwrites fixed-size (n_pairs, BOOK_DEPTH) live tables in
+    place, bracketing each row with a seqlock-style generation bump (odd
+    while writing), and marks the pair dirty. Once per scan, publish()
+    copies the dirty rows into the snapshot tables the scanner kernels
+    read, plus the edge weights of each pair (2*i sells base for quote,
+    2*i+1 buys base with quote). Nothing is allocated per update.
+    """
     def __init__(self):
-        self.orderbooks = {}
-        self.lock = threading.Lock()
+        self.set_symbols([])
+    
+    def set_symbols(self, symbols):
+        """Allocate storage for the pairs the scanner reads"""
+        n = len(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        
+        # Live tables, written by the updater
+        self._bid_p = np.zeros((n, BOOK_DEPTH))
+        self._bid_v = np.zeros((n, BOOK_DEPTH))
+        self._ask_p = np.zeros((n, BOOK_DEPTH))
+        self._ask_v = np.zeros((n, BOOK_DEPTH))
+        self._valid = np.zeros(n, dtype=np.uint8)
+        self._edge_weights = np.full(2 * n, np.inf)
+        self.updated_at = np.zeros(n)
+        self.generation = np.zeros(n, dtype=np.int64)
+        
+        # Snapshot tables, read by the scanner
+        self.bid_p = np.zeros((n, BOOK_DEPTH))
+        self.bid_v = np.zeros((n, BOOK_DEPTH))
+        self.ask_p = np.zeros((n, BOOK_DEPTH))
+        self.ask_v = np.zeros((n, BOOK_DEPTH))
+        self.valid = np.zeros(n, dtype=np.uint8)
+        self.edge_weights = np.full(2 * n, np.inf)
+        self.dirty = np.zeros(n, dtype=np.uint8)  # Rows updated since the last scan
         
     def update(self, symbol, bids, asks):
         """Update orderbook for symbol"""
-        with self.lock:
-            self.orderbooks[symbol] = {
-                'bids': bids,
-                'asks': asks,
-                'timestamp': time.time()
-            }
+        idx = self.index.get(symbol)
+        if idx is None:
+            return
+        
+        self.generation[idx] += 1
+        _write_levels(self._bid_p[idx], self._bid_v[idx], bids)
+        _write_levels(self._ask_p[idx], self._ask_v[idx], asks)
+        self._edge_weights[2 * idx:2 * idx + 2] = _edge_weights(self._bid_p[idx], self._ask_p[idx])
+        self._valid[idx] = 1
+        self.updated_at[idx] = time.time()
+        self.generation[idx] += 1
+        self.dirty[idx] = 1
+    
+    def invalidate(self, symbol):
+        """Mark orderbook for symbol as stale"""
+        idx = self.index.get(symbol)
+        if idx is not None:
+            self._valid[idx] = 0
+            self.dirty[idx] = 1
     
-    def get(self, symbol):
-        """Get orderbook for symbol"""
-        with self.lock:
-            return self.orderbooks.get(symbol)
+    def take_dirty(self):
+        """Return and clear the pair ids updated since the last call
+        
+        Writers only ever set their row's flag after the row is written, and
+        publish() copies rows after the flags are cleared, so a write that
+        lands while draining is either seen now or flagged again. Published
+        books that have gone silent for longer than TS_DELTA_CONSECUTIVE_MS
+        are included too, so publish() can retire them.
+        """
+        max_age = config.TS_DELTA_CONSECUTIVE_MS / 1000
+        stale = self.valid.astype(bool) & (time.time() - self.updated_at > max_age)
+        dirty = np.flatnonzero(self.dirty | stale)
+        self.dirty[dirty] = 0
+        return dirty
+    
+    def publish(self, dirty):
+        """Copy the live rows for the dirty pair ids into the scan tables
+        
+        A row caught mid-write (odd or changed generation) is left invalid
+        for this scan and marked dirty again instead of spinning. A row not
+        updated within TS_DELTA_CONSECUTIVE_MS is published as invalid.
+        """
+        now = time.time()
+        max_age = config.TS_DELTA_CONSECUTIVE_MS / 1000
+        
+        for idx in dirty:
+            gen = int(self.generation[idx])
+            self.bid_p[idx] = self._bid_p[idx]
+            self.bid_v[idx] = self._bid_v[idx]
+            self.ask_p[idx] = self._ask_p[idx]
+            self.ask_v[idx] = self._ask_v[idx]
+            self.edge_weights[2 * idx:2 * idx + 2] = self._edge_weights[2 * idx:2 * idx + 2]
+            self.valid[idx] = self._valid[idx] and now - self.updated_at[idx] <= max_age
+            
+            if gen & 1 or self.generation[idx] != gen:
+                self.valid[idx] = 0
+                self.edge_weights[2 * idx:2 * idx + 2] = np.inf
+                self.dirty[idx] = 1
+                continue
+            
+            if not self.valid[idx]:
+                self.edge_weights[2 * idx:2 * idx + 2] = np.inf
 
 orderbook = SimpleOrderBook()
-  # ==================== TRIANGLE SCANNER ====================
+
+class ChangeSignal:
+    """asyncio.Event owned by the scanner loop, settable from the updater thread"""
+    def __init__(self):
+        self.loop = None
+        self.event = None
+    
+    def bind(self):
+        """Create the event on the running (scanner) loop"""
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+    
+    def set(self):
+        """Wake the scanner; a no-op while a wakeup is pending or once the loop has closed"""
+        if self.event is not None and not self.event.is_set():
+            try:
+                self.loop.call_soon_threadsafe(self.event.set)
+            except RuntimeError:
+                pass  # Scanner loop has shut down
+
+ob_changed = ChangeSignal()
+
+# Wall clock string for opportunities, refreshed by the scanner loop
+_now_str = [time.strftime('%H:%M:%S')]
+
+async def refresh_clock():
+    """Keep _now_str current without calling strftime on the hot path"""
+    while True:
+        _now_str[0] = time.strftime('%H:%M:%S')
+        await asyncio.sleep(0.5)
+
+# ==================== ORDERBOOK WALK (NUMBA) ====================
+@njit(cache=True, fastmath=True)
+def _walk_sell(bid_p, bid_v, current):
+    """Quote received for selling `current` base into the bids, -1 if too thin"""
+    remaining = current
+    received = 0.0
+    
+    for i in range(bid_p.shape[0]):
+        if bid_v[i] >= remaining:
+            received += remaining * bid_p[i]
+            remaining = 0.0
+            break
+        received += bid_v[i] * bid_p[i]
+        remaining -= bid_v[i]
+    
+    if remaining > 0.00001:
+        return -1.0
+    return received
+
+@njit(cache=True, fastmath=True)
+def _walk_buy(ask_p, ask_v, current):
+    """Base acquired for spending `current` quote on the asks, -1 if too thin"""
+    remaining = current
+    acquired = 0.0
+    
+    for i in range(ask_p.shape[0]):
+        cost = ask_p[i] * ask_v[i]
+        if cost <= remaining:
+            acquired += ask_v[i]
+            remaining -= cost
+        else:
+            acquired += remaining / ask_p[i]
+            remaining = 0.0
+            break
+    
+    if remaining > 0.00001:
+        return -1.0
+    return acquired
+
+@njit(cache=True, fastmath=True)
+def _walk_triangle(tri_pairs, tri_dirs, bid_p, bid_v, ask_p, ask_v, valid, t, amount):
+    """Final notional of triangle t, -1 if any leg is stale or cannot be filled"""
+    current = amount
+    for leg in range(3):
+        pair = tri_pairs[t, leg]
+        if not valid[pair]:
+            return -1.0
+        if tri_dirs[t, leg]:
+            current = _walk_sell(bid_p[pair], bid_v[pair], current)
+        else:
+            current = _walk_buy(ask_p[pair], ask_v[pair], current)
+        if current < 0:
+            return -1.0
+    
+    # Fee for all three legs at once
+    return current * TRIANGLE_FEE
+
+# One scan kernel per (sell/buy, sell/buy, sell/buy) pattern, with the
+# leg directions and the total fee baked in instead of branching on
+# tri_dirs and multiplying by the fee per leg
+_SCAN_TEMPLATE = """
+def scan_pattern_{mask}(tids, tri_pairs, bid_p, bid_v, ask_p, ask_v, valid, amount, out):
+    for k in prange(tids.shape[0]):
+        t = tids[k]
+        p0 = tri_pairs[t, 0]
+        p1 = tri_pairs[t, 1]
+        p2 = tri_pairs[t, 2]
+        out[t] = -1.0
+        if not (valid[p0] and valid[p1] and valid[p2]):
+            continue
+        current = {walk0}({side0}_p[p0], {side0}_v[p0], amount)
+        if current < 0:
+            continue
+        current = {walk1}({side1}_p[p1], {side1}_v[p1], current)
+        if current < 0:
+            continue
+        current = {walk2}({side2}_p[p2], {side2}_v[p2], current)
+        if current < 0:
+            continue
+        out[t] = current * {fee}
+"""
+
+def _build_scan_kernels():
+    """Generate the 8 direction-specialized triangle scan kernels
+    
+    Pattern index is (d0 << 2) | (d1 << 1) | d2 with 1 for a sell leg.
+    Generated code has no source file, so these are not disk-cached.
+    """
+    namespace = {'prange': prange, '_walk_sell': _walk_sell, '_walk_buy': _walk_buy}
+    kernels = []
+    for mask in range(8):
+        legs = {}
+        for leg in range(3):
+            sell = mask >> (2 - leg) & 1
+            legs[f'walk{leg}'] = '_walk_sell' if sell else '_walk_buy'
+            legs[f'side{leg}'] = 'bid' if sell else 'ask'
+        exec(_SCAN_TEMPLATE.format(mask=mask, fee=repr(TRIANGLE_FEE), **legs), namespace)
+        kernels.append(njit(fastmath=True, parallel=True)(namespace[f'scan_pattern_{mask}']))
+    return kernels
+
+SCAN_KERNELS = _build_scan_kernels()
+
+@njit(cache=True, fastmath=True)
+def _walk_path(edges, bid_p, bid_v, ask_p, ask_v, valid, amount):
+    """Final notional after walking the depth of each edge in turn, -1 if any leg fails"""
+    current = amount
+    for e in edges:
+        pair = e // 2
+        if not valid[pair]:
+            return -1.0
+        if e % 2 == 0:
+            current = _walk_sell(bid_p[pair], bid_v[pair], current)
+        else:
+            current = _walk_buy(ask_p[pair], ask_v[pair], current)
+        if current < 0:
+            return -1.0
+    
+    # Fee for every leg at once
+    return current * FEE_RATE ** edges.shape[0]
+
+@njit(cache=True)
+def bellman_ford_cycle(edge_src, edge_dst, edge_weights, n_nodes, source, max_hops):
+    """Edges of the cheapest negative loop from source back to source, empty if none
+    
+    Runs over -log rates, so a negative loop is a chain of trades whose
+    top-of-book rates multiply to more than 1 after fees. dist[k, v] is the
+    cheapest walk of exactly k edges from source to v, so every loop found
+    starts and ends at source and has at most max_hops legs.
+    """
+    dist = np.full((max_hops + 1, n_nodes), np.inf)
+    pred = np.full((max_hops + 1, n_nodes), -1, dtype=np.int64)
+    dist[0, source] = 0.0
+    
+    best_k = 0
+    best = -1e-12
+    for k in range(1, max_hops + 1):
+        for e in range(edge_src.shape[0]):
+            u = edge_src[e]
+            v = edge_dst[e]
+            if dist[k - 1, u] + edge_weights[e] < dist[k, v]:
+                dist[k, v] = dist[k - 1, u] + edge_weights[e]
+                pred[k, v] = e
+        if dist[k, source] < best:
+            best = dist[k, source]
+            best_k = k
+    
+    cycle = np.empty(best_k, dtype=np.int64)
+    v = source
+    for k in range(best_k, 0, -1):
+        e = pred[k, v]
+        cycle[k - 1] = e
+        v = edge_src[e]
+    return cycle
+
+# ==================== TRIANGLE SCANNER ====================
 class TriangleScanner:
     """Find and analyze triangles"""
     
-    def __init__(self, exchange, markets):
+    def __init__(self, exchange, markets, symbols):
         self.exchange = exchange
         self.markets = markets
+        self.symbols = symbols
         self.triangles = []
         
+        # Structure-of-arrays view of self.triangles for the kernels
+        self.pairs = []
+        self.pair_to_idx = {}
+        self.tri_pairs = np.zeros((0, 3), dtype=np.int32)
+        self.tri_dirs = np.zeros((0, 3), dtype=np.uint8)
+        self.tri_fn = np.zeros(0, dtype=np.uint8)  # Index into SCAN_KERNELS
+        
+        # Incremental scanning: triangles touching each pair, last result per triangle
+        self.pair_to_triangles = []
+        self.last_profit = np.zeros(0)
+        
+        # Currency graph for Bellman-Ford, two edges per pair
+        self.currencies = []
+        self.edge_src = np.zeros(0, dtype=np.int32)
+        self.edge_dst = np.zeros(0, dtype=np.int32)
+        
     def build_adjacency(self):
-        """Build graph of trading pairs"""
-        adj = defaultdict(list)
+        """Build undirected graph of trading pairs: currency -> {neighbor: symbol}
+        
+        Only the USDT star is kept: the USDT pairs in self.symbols plus the
+        crosses between their assets.
+        """
+        star = {'USDT'}
+        for symbol in self.symbols:
+            market = self.markets[symbol]
+            star.update((market['base'], market['quote']))
+        
+        adj = defaultdict(dict)
         
         for symbol, market in self.markets.items():
-            if not market.get('active', True):
+            if not market.get('active', True) or not market.get('spot', True):
                 continue
                 
             base = market['base']
             quote = market['quote']
             
-            # Only USDT pairs for now
-            if quote != 'USDT' and base != 'USDT':
+            if base not in star or quote not in star:
+                continue
+            
+            # USDT legs are limited to the watched symbols
+            if 'USDT' in (base, quote) and symbol not in self.symbols:
                 continue
                 
-            adj[base].append((quote, symbol, 'buy'))
-            adj[quote].append((base, symbol, 'sell'))
+            adj[base][quote] = symbol
+            adj[quote][base] = symbol
         
         return adj
     
+    def _leg(self, frm, to, adj):
+        """Pair and direction for converting `frm` into `to`"""
+        symbol = adj[frm][to]
+        direction = 'sell' if self.markets[symbol]['base'] == frm else 'buy'
+        return symbol, direction
+    
     def find_triangles(self):
-        """Find all USDT-based triangles"""
+        """Find all USDT-based triangles
+        
+        Degree-ordered node iterator: edges are only followed from lower
+        to higher rank, so each triangle is found exactly once, then
+        expanded into its two trading directions.
+        """
         adj = self.build_adjacency()
         triangles = []
         
-        # USDT -> A -> B -> USDT
         start = 'USDT'
         
         if start not in adj:
             return triangles
         
-        for (b, sab, dab) in adj[start]:
-            for (c, sbc, dbc) in adj.get(b, []):
-                if c == start:
-                    continue
-                for (back, sca, dca) in adj.get(c, []):
-                    if back == start:
-                        triangles.append({
-                            'path': [start, b, c],
-                            'pairs': [sab, sbc, sca],
-                            'directions': [dab, dbc, dca],
-                            'string': f"{start} → {b} → {c} → {start}"
-                        })
-        
-        return triangles[:config.MAX_TRIANGLES]
-    
-    def simulate_triangle(self, triangle, amount):
+        # Rank currencies by descending degree
+        order = sorted(adj, key=lambda c: (-len(adj[c]), c))
+        rank = {c: i for i, c in enumerate(order)}
+        forward = {
+            u: sorted((v for v in adj[u] if rank[v] > rank[u]), key=rank.get)
+            for u in order
+        }
+        
+        canonical = []
+        for u in order:
+            for v in forward[u]:
+                # Sorted merge of N>(u) and N>(v)
+                nu, nv = forward[u], forward[v]
+                i = j = 0
+                while i < len(nu) and j < len(nv):
+                    ru, rv = rank[nu[i]], rank[nv[j]]
+                    if ru == rv:
+                        if start in (u, v, nu[i]):
+                            canonical.append((u, v, nu[i]))
+                        i += 1
+                        j += 1
+                    elif ru < rv:
+                        i += 1
+                    else:
+                        j += 1
+                if len(canonical) >= config.MAX_TRIANGLES:
+                    break
+            if len(canonical) >= config.MAX_TRIANGLES:
+                break
+        
+        # USDT -> A -> B -> USDT and USDT -> B -> A -> USDT
+        for tri in canonical[:config.MAX_TRIANGLES]:
+            a, b = [c for c in tri if c != start]
+            for path in ([start, a, b], [start, b, a]):
+                legs = [self._leg(path[k], path[(k + 1) % 3], adj) for k in range(3)]
+                triangles.append({
+                    'path': path,
+                    'pairs': [symbol for symbol, _ in legs],
+                    'directions': [direction for _, direction in legs],
+                    'string': f"{start} → {path[1]} → {path[2]} → {start}"
+                })
+        
+        return triangles
+    
+    def _cache_key(self):
+        """Digest of everything find_triangles depends on, down to each market's fields"""
+        markets = [
+            f"{symbol}|{m['base']}|{m['quote']}|{m.get('active', True)}|{m.get('spot', True)}"
+            for symbol, m in sorted(self.markets.items())
+        ]
+        digest = hashlib.sha1()
+        for part in (markets, self.symbols, [str(config.MAX_TRIANGLES)]):
+            digest.update('\n'.join(part).encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def _cached_triangle_ok(self, triangle):
+        """Whether a cached entry has the shape find_triangles produces"""
+        return (
+            isinstance(triangle, dict)
+            and isinstance(triangle.get('string'), str)
+            and isinstance(triangle.get('pairs'), list)
+            and isinstance(triangle.get('directions'), list)
+            and len(triangle['pairs']) == 3
+            and len(triangle['directions']) == 3
+            and all(isinstance(p, str) and p in self.markets for p in triangle['pairs'])
+            and all(d in ('buy', 'sell') for d in triangle['directions'])
+        )
+    
+    def load_triangles(self):
+        """find_triangles, memoized on disk as JSON until the market set changes"""
+        key = self._cache_key()
+        
+        try:
+            with open(config.TRIANGLE_CACHE, 'rb') as f:
+                cached = orjson.loads(f.read())
+            triangles = cached['triangles']
+            if cached['key'] == key and all(self._cached_triangle_ok(t) for t in triangles):
+                log("♻️  Loaded triangles from cache")
+                return triangles
+        except Exception:
+            pass  # Missing, unreadable or foreign cache file; rebuild it
+        
+        triangles = self.find_triangles()
+        
+        try:
+            with open(config.TRIANGLE_CACHE, 'wb') as f:
+                f.write(orjson.dumps({'key': key, 'triangles': triangles}))
+        except OSError as e:
+            log(f"⚠️  Could not write triangle cache: {e}")
+        
+        return triangles
+    
+    def index_triangles(self, triangles):
+        """Store triangles and build their int-indexed SoA form"""
+        self.triangles = triangles
+        self.pairs = sorted({pair for t in triangles for pair in t['pairs']})
+        self.pair_to_idx = {sym: i for i, sym in enumerate(self.pairs)}
+        self.tri_pairs = np.array(
+            [[self.pair_to_idx[p] for p in t['pairs']] for t in triangles],
+            dtype=np.int32
+        ).reshape(-1, 3)
+        self.tri_dirs = np.array(
+            [[d == 'sell' for d in t['directions']] for t in triangles],
+            dtype=np.uint8
+        ).reshape(-1, 3)
+        self.tri_fn = (
+            (self.tri_dirs[:, 0] << 2) | (self.tri_dirs[:, 1] << 1) | self.tri_dirs[:, 2]
+        ).astype(np.uint8)
+        
+        self.pair_to_triangles = [
+            np.flatnonzero((self.tri_pairs == i).any(axis=1)) for i in range(len(self.pairs))
+        ]
+        self.last_profit = np.full(len(triangles), -1.0)
+        
+        # Edge 2*i sells base -> quote, edge 2*i+1 buys quote -> base
+        self.currencies = sorted({
+            c for p in self.pairs for c in (self.markets[p]['base'], self.markets[p]['quote'])
+        })
+        currency_idx = {c: i for i, c in enumerate(self.currencies)}
+        src, dst = [], []
+        for pair in self.pairs:
+            base = currency_idx[self.markets[pair]['base']]
+            quote = currency_idx[self.markets[pair]['quote']]
+            src += [base, quote]
+            dst += [quote, base]
+        self.edge_src = np.array(src, dtype=np.int32)
+        self.edge_dst = np.array(dst, dtype=np.int32)
+    
+    def scan(self, amount, dirty):
+        """Final notional of every triangle, re-simulating only those touching dirty pairs"""
+        if len(dirty):
+            affected = np.unique(np.concatenate([self.pair_to_triangles[p] for p in dirty]))
+            patterns = self.tri_fn[affected]
+            for mask in np.unique(patterns):
+                SCAN_KERNELS[mask](
+                    affected[patterns == mask], self.tri_pairs,
+                    orderbook.bid_p, orderbook.bid_v, orderbook.ask_p, orderbook.ask_v,
+                    orderbook.valid, amount, self.last_profit
+                )
+        return self.last_profit
+    
+    def warm_up(self):
+        """Compile every kernel the scanner loop calls before any data arrives"""
+        no_triangles = np.empty(0, dtype=np.int64)
+        for kernel in SCAN_KERNELS:
+            kernel(
+                no_triangles, self.tri_pairs,
+                orderbook.bid_p, orderbook.bid_v, orderbook.ask_p, orderbook.ask_v,
+                orderbook.valid, config.TRADE_AMOUNT, self.last_profit
+            )
+        bellman_ford_cycle(
+            self.edge_src, self.edge_dst, orderbook.edge_weights,
+            max(len(self.currencies), 1), 0, config.MAX_CYCLE_HOPS
+        )
+        _walk_path(
+            no_triangles, orderbook.bid_p, orderbook.bid_v, orderbook.ask_p, orderbook.ask_v,
+            orderbook.valid, config.TRADE_AMOUNT
+        )
+        if len(self.triangles):
+            _walk_triangle(
+                self.tri_pairs, self.tri_dirs,
+                orderbook.bid_p, orderbook.bid_v, orderbook.ask_p, orderbook.ask_v,
+                orderbook.valid, 0, config.TRADE_AMOUNT
+            )
+    
+    def simulate_triangle(self, tid, amount):
         """Simulate triangle trade"""
         try:
-            pairs = triangle['pairs']
-            directions = triangle['directions']
-            
-            current = amount
-            
-            for pair, direction in zip(pairs, directions):
-                ob = orderbook.get(pair)
-                if not ob:
-                    return None
-                
-                # Simple orderbook walk
-                if direction == 'sell':
-                    # Sell base for quote
-                    bids = ob['bids']
-                    remaining = current
-                    received = 0
-                    
-                    for price, volume in bids:
-                        if volume >= remaining:
-                            received += remaining * price
-                            remaining = 0
-                            break
-                        else:
-                            received += volume * price
-                            remaining -= volume
-                    
-                    if remaining > 0.00001:
-                        return None
-                    
-                    current = received
-                else:
-                    # Buy base with quote
-                    asks = ob['asks']
-                    remaining = current
-                    acquired = 0
-                    
-                    for price, volume in asks:
-                        cost = price * volume
-                        if cost <= remaining:
-                            acquired += volume
-                            remaining -= cost
-                        else:
-                            acquired += remaining / price
-                            remaining = 0
-                            break
-                    
-                    if remaining > 0.00001:
-                        return None
-                    
-                    current = acquired
-                
-                # Apply fee (0.1%)
-                current *= 0.999
-            
-            profit = current - amount
-            profit_pct = (profit / amount) * 100
+            triangle = self.triangles[tid]
             
-            if profit_pct < config.MIN_PROFIT:
+            current = _walk_triangle(
+                self.tri_pairs, self.tri_dirs,
+                orderbook.bid_p, orderbook.bid_v, orderbook.ask_p, orderbook.ask_v,
+                orderbook.valid, tid, amount
+            )
+            if current < 0:
                 return None
             
-            return {
-                'triangle': triangle['string'],
-                'pairs': triangle['pairs'],
-                'profit_pct': round(profit_pct, 3),
-                'profit_usd': round(profit, 2),
-                'timestamp': datetime.now().strftime('%H:%M:%S')
-            }
+            return self._opportunity(triangle['string'], triangle['pairs'], current, amount)
             
         except Exception as e:
-            print(f"Simulation error: {e}")
+            log(f"Simulation error: {e}")
+            return None
+    
+    def find_cycle(self, amount):
+        """Best-rate negative loop from USDT back to USDT, re-simulated against depth"""
+        if 'USDT' not in self.currencies:
+            return None
+        
+        edges = bellman_ford_cycle(
+            self.edge_src, self.edge_dst, orderbook.edge_weights,
+            len(self.currencies), self.currencies.index('USDT'), config.MAX_CYCLE_HOPS
+        )
+        if not len(edges):
+            return None
+        
+        current = _walk_path(
+            edges, orderbook.bid_p, orderbook.bid_v, orderbook.ask_p, orderbook.ask_v,
+            orderbook.valid, amount
+        )
+        if current < 0:
+            return None
+        
+        path = [self.currencies[self.edge_src[e]] for e in edges] + ['USDT']
+        pairs = [self.pairs[e // 2] for e in edges]
+        return self._opportunity(' → '.join(path), pairs, current, amount)
+    
+    def _opportunity(self, path_string, pairs, current, amount):
+        """Opportunity dict for a simulated path, None below MIN_PROFIT"""
+        profit = current - amount
+        profit_pct = (profit / amount) * 100
+        
+        if profit_pct < config.MIN_PROFIT:
             return None
+        
+        return {
+            'triangle': path_string,
+            'pairs': pairs,
+            'profit_pct': profit_pct,
+            'profit_usd': profit,
+            'timestamp': _now_str[0]
+        }
       # ==================== TRADE EXECUTOR ====================
+class _StatsShard:
+    """Counters owned by a single writer thread"""
+    __slots__ = ('total_trades', 'profitable', 'total_profit', 'best_trade')
+    
+    def __init__(self):
+        self.total_trades = 0
+        self.profitable = 0
+        self.total_profit = 0.0
+        self.best_trade = 0.0
+
+class TradeStats:
+    """Scalable trade counters: one shard per writer thread, summed on read
+    
+    Recording only touches the calling thread's shard, so concurrent
+    executors never race on a shared +=. Shards stay registered after
+    their thread exits so no counts are lost.
+    """
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._register_lock = threading.Lock()
+    
+    def _shard(self):
+        """Calling thread's shard, created on first use"""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _StatsShard()
+            with self._register_lock:
+                self._shards.append(shard)
+        return shard
+    
+    def record(self, profit_usd):
+        """Count one trade and its profit"""
+        shard = self._shard()
+        shard.total_trades += 1
+        
+        if profit_usd > 0:
+            shard.profitable += 1
+            shard.total_profit += profit_usd
+            if profit_usd > shard.best_trade:
+                shard.best_trade = profit_usd
+    
+    def snapshot(self):
+        """Aggregate all shards into a stats dict"""
+        shards = list(self._shards)
+        return {
+            'total_trades': sum(s.total_trades for s in shards),
+            'profitable': sum(s.profitable for s in shards),
+            'total_profit': sum(s.total_profit for s in shards),
+            'best_trade': max((s.best_trade for s in shards), default=0.0)
+        }
+
+class TradeRing:
+    """Fixed-size ring of recent trades
+    
+    The single writer stores into a preallocated slot and then bumps the
+    index; readers snapshot the index once and walk back from it, so they
+    never iterate a container that is being mutated.
+    """
+    
+    def __init__(self, size=100):
+        self.size = size
+        self.slots = [None] * size
+        self.idx = 0
+    
+    def append(self, trade):
+        """Store a trade, overwriting the oldest once full"""
+        self.slots[self.idx % self.size] = trade
+        self.idx += 1
+    
+    def latest(self, limit=None):
+        """Most recent trades first"""
+        i = self.idx
+        n = min(limit or self.size, self.size, i)
+        return [self.slots[(i - 1 - k) % self.size] for k in range(n)]
+
 class TradeExecutor:
     """Execute triangular trades"""
     
-    def __init__(self, exchange):
+    def __init__(self, exchange, feed=None):
         self.exchange = exchange
-        self.trades = deque(maxlen=100)  # Store last 100 trades
-        self.stats = {
-            'total_trades': 0,
-            'profitable': 0,
-            'total_profit': 0,
-            'best_trade': 0
-        }
+        self.feed = feed  # Queue to the dashboard process
+        self.stats = TradeStats()
         
     def execute(self, opportunity):
         """Execute a trade opportunity"""
         trade_id = f"TR{int(time.time())}"
         
-        print(f"\n🎯 Found opportunity: {opportunity['triangle']}")
-        print(f"   Profit: {opportunity['profit_pct']}% (${opportunity['profit_usd']})")
+        log(f"\n🎯 Found opportunity: {opportunity['triangle']}")
+        log(f"   Profit: {opportunity['profit_pct']:.3f}% (${opportunity['profit_usd']:.2f})")
         
         if config.DRY_RUN:
-            print("   ⚠️  DRY RUN - No real trade executed")
+            log("   ⚠️  DRY RUN - No real trade executed")
             trade_result = {
                 'id': trade_id,
                 'triangle': opportunity['triangle'],
@@ -260,13 +864,13 @@ class TradeExecutor:
             }
         else:
             try:
-                print("   🚀 Executing live trade...")
+                log("   🚀 Executing live trade...")
                 # Execute each leg
                 pairs = opportunity['pairs']
                 
                 for i, pair in enumerate(pairs):
                     # This is simplified - in reality you'd handle order placement properly
-                    print(f"   Leg {i+1}: {pair}")
+                    log(f"   Leg {i+1}: {pair}")
                     time.sleep(0.1)  # Small delay between legs
                 
                 trade_result = {
@@ -278,10 +882,10 @@ class TradeExecutor:
                     'timestamp': datetime.now().isoformat()
                 }
                 
-                print("   ✅ Trade completed!")
+                log("   ✅ Trade completed!")
                 
             except Exception as e:
-                print(f"   ❌ Trade failed: {e}")
+                log(f"   ❌ Trade failed: {e}")
                 trade_result = {
                     'id': trade_id,
                     'triangle': opportunity['triangle'],
@@ -292,20 +896,40 @@ class TradeExecutor:
                     'timestamp': datetime.now().isoformat()
                 }
         
-        # Update stats
-        self.trades.appendleft(trade_result)
-        self.stats['total_trades'] += 1
+        # Update stats; the trade history lives in the dashboard process
+        self.stats.record(trade_result['profit_usd'])
         
-        if trade_result['profit_usd'] > 0:
-            self.stats['profitable'] += 1
-            self.stats['total_profit'] += trade_result['profit_usd']
-            if trade_result['profit_usd'] > self.stats['best_trade']:
-                self.stats['best_trade'] = trade_result['profit_usd']
+        if self.feed is not None:
+            try:
+                self.feed.put_nowait((trade_result, self.stats.snapshot()))
+            except queue.Full:
+                pass
         
         return trade_result
 
 # ==================== WEB DASHBOARD ====================
-def create_dashboard(executor, scanner):
+class DashboardState:
+    """Trades and stats mirrored into the dashboard process"""
+    
+    def __init__(self, triangle_count):
+        self.triangle_count = triangle_count
+        self.trades = TradeRing(100)
+        self.stats = {
+            'total_trades': 0,
+            'profitable': 0,
+            'total_profit': 0,
+            'best_trade': 0
+        }
+    
+    def consume(self, feed):
+        """Apply (trade, stats) updates pushed by the executor"""
+        while True:
+            trade, stats = feed.get()
+            if trade is not None:
+                self.trades.append(trade)
+            self.stats = stats
+
+def create_dashboard(state):
     """Create simple web dashboard"""
     app = Flask(__name__)
     
@@ -329,7 +953,7 @@ def create_dashboard(executor, scanner):
             .profit-negative { color: #f85149; }
             .status-badge { padding: 3px 8px; border-radius: 12px; font-size: 12px; }
             .status-executed { background: #238636; color: white; }
-            .status-dry { background: #8957e5; color: white; }
+            .status-dry_run { background: #8957e5; color: white; }
             .status-failed { background: #da3633; color: white; }
         </style>
     </head>
@@ -337,25 +961,25 @@ def create_dashboard(executor, scanner):
         <div class="container">
             <div class="header">
                 <h1>🔺 Triangular Arbitrage Bot</h1>
-                <p>Live trading dashboard | Last updated: {{ timestamp }}</p>
+                <p>Live trading dashboard | Last updated: <span id="timestamp">-</span></p>
             </div>
             
             <div class="stats">
                 <div class="stat-box">
                     <div>Total Trades</div>
-                    <div class="stat-value">{{ stats.total_trades }}</div>
+                    <div class="stat-value" id="total_trades">0</div>
                 </div>
                 <div class="stat-box">
                     <div>Profitable</div>
-                    <div class="stat-value">{{ stats.profitable }}</div>
+                    <div class="stat-value" id="profitable">0</div>
                 </div>
                 <div class="stat-box">
                     <div>Total Profit</div>
-                    <div class="stat-value">${{ "%.2f"|format(stats.total_profit) }}</div>
+                    <div class="stat-value" id="total_profit">$0.00</div>
                 </div>
                 <div class="stat-box">
                     <div>Best Trade</div>
-                    <div class="stat-value">${{ "%.2f"|format(stats.best_trade) }}</div>
+                    <div class="stat-value" id="best_trade">$0.00</div>
                 </div>
                 <div class="stat-box">
                     <div>Triangles</div>
@@ -363,172 +987,295 @@ def create_dashboard(executor, scanner):
                 </div>
                 <div class="stat-box">
                     <div>Trade Amount</div>
-                    <div class="stat-value">${{ config.trade_amount }}</div>
+                    <div class="stat-value">${{ trade_amount }}</div>
                 </div>
             </div>
             
             <div class="trades">
                 <h2>Recent Trades</h2>
-                {% for trade in trades %}
-                <div class="trade-row">
-                    <strong>{{ trade.triangle }}</strong><br>
-                    <span class="profit-positive">Profit: {{ trade.profit_pct }}% (${{ "%.2f"|format(trade.profit_usd) }})</span> |
-                    Time: {{ trade.timestamp[11:19] }} |
-                    Status: <span class="status-badge status-{{ trade.status }}">{{ trade.status|upper }}</span>
-                </div>
-                {% endfor %}
+                <div id="trades"></div>
             </div>
         </div>
         
         <script>
-            // Auto-refresh every 5 seconds
-            setTimeout(() => location.reload(), 5000);
+            function tradeRow(trade) {
+                const row = document.createElement('div');
+                row.className = 'trade-row';
+                const title = document.createElement('strong');
+                title.textContent = trade.triangle;
+                const profit = document.createElement('span');
+                profit.className = 'profit-positive';
+                profit.textContent = `Profit: ${trade.profit_pct.toFixed(3)}% ($${trade.profit_usd.toFixed(2)})`;
+                const status = document.createElement('span');
+                status.className = `status-badge status-${trade.status}`;
+                status.textContent = trade.status.toUpperCase();
+                row.append(title, document.createElement('br'), profit,
+                           ` | Time: ${trade.timestamp.slice(11, 19)} | Status: `, status);
+                return row;
+            }
+            
+            async function refresh() {
+                const [stats, trades] = await Promise.all([
+                    fetch('/api/stats').then(r => r.json()),
+                    fetch('/api/trades').then(r => r.json())
+                ]);
+                document.getElementById('total_trades').textContent = stats.total_trades;
+                document.getElementById('profitable').textContent = stats.profitable;
+                document.getElementById('total_profit').textContent = `$${stats.total_profit.toFixed(2)}`;
+                document.getElementById('best_trade').textContent = `$${stats.best_trade.toFixed(2)}`;
+                document.getElementById('trades').replaceChildren(...trades.trades.slice(0, 20).map(tradeRow));
+                document.getElementById('timestamp').textContent = new Date().toLocaleString();
+            }
+            
+            // Poll the JSON endpoints every 5 seconds
+            refresh();
+            setInterval(refresh, 5000);
         </script>
     </body>
     </html>
     """
     
+    # The shell only depends on startup values, so render it once
+    TEMPLATE = app.jinja_env.from_string(HTML_TEMPLATE)
+    SHELL = TEMPLATE.render(
+        triangle_count=state.triangle_count,
+        trade_amount=config.TRADE_AMOUNT
+    )
+    
     @app.route('/')
     def index():
-        return render_template_string(HTML_TEMPLATE,
-            trades=list(executor.trades)[:20],
-            stats=executor.stats,
-            triangle_count=len(scanner.triangles),
-            config={'trade_amount': config.TRADE_AMOUNT},
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        )
+        return SHELL, 200, {'Cache-Control': 'max-age=3600'}
+    
+    def json_response(payload):
+        return app.response_class(orjson.dumps(payload), mimetype='application/json')
     
     @app.route('/api/trades')
     def api_trades():
-        return {'trades': list(executor.trades)}
+        return json_response({'trades': state.trades.latest()})
     
     @app.route('/api/stats')
     def api_stats():
-        return executor.stats
+        return json_response(state.stats)
     
     return app
+
+def run_dashboard(feed, triangle_count):
+    """Dashboard process entry point, isolated from the scanner's GIL"""
+    state = DashboardState(triangle_count)
+    threading.Thread(target=state.consume, args=(feed,), daemon=True).start()
+    
+    create_dashboard(state).run(
+        host='0.0.0.0',
+        port=config.WEB_PORT,
+        debug=False
+    )
+
 # ==================== ORDERBOOK UPDATER ====================
-def update_orderbooks(exchange, symbols):
-    """Simple orderbook updater using REST"""
+def stream_url(streams):
+    """Binance combined stream URL for a list of stream names"""
+    if config.USE_TESTNET:
+        base = 'wss://testnet.binance.vision/stream'
+    else:
+        base = 'wss://stream.binance.com:9443/stream'
+    return f"{base}?streams={'/'.join(streams)}"
+
+def read_streams(streams):
+    """Apply partial depth snapshots from one combined stream connection
+    
+    streams maps stream name (e.g. btcusdt@depth10@100ms) to symbol.
+    Every payload is a complete top-of-book snapshot, so each one is
+    applied as valid; books that stop arriving are aged out by
+    SimpleOrderBook.publish().
+    """
+    pin_current_thread(config.OB_CORE, "Orderbook updater")
+    
     while True:
-        for symbol in symbols:
-            try:
-                # Fetch orderbook
-                ob = exchange.fetch_order_book(symbol, limit=20)
-                orderbook.update(symbol, ob['bids'][:10], ob['asks'][:10])
+        ws = None
+        try:
+            ws = create_connection(stream_url(list(streams)), timeout=10)
+            
+            while True:
+                msg = orjson.loads(ws.recv())
+                symbol = streams.get(msg.get('stream'))
+                if symbol is None:
+                    continue
                 
-                # Small delay to avoid rate limits
-                time.sleep(0.05)
+                data = msg['data']
+                orderbook.update(symbol, data['bids'], data['asks'])
+                ob_changed.set()
                 
-            except Exception as e:
-                print(f"Error fetching {symbol}: {e}")
-                time.sleep(1)
+        except Exception as e:
+            log(f"Orderbook stream error: {e}")
+            for symbol in streams.values():
+                orderbook.invalidate(symbol)
+            ob_changed.set()
+            time.sleep(1)
+        finally:
+            if ws:
+                ws.close()
+
+def start_orderbook_streams(markets, symbols):
+    """Read depth10@100ms for all symbols, sharded over combined stream connections"""
+    streams = [(f"{markets[s]['id'].lower()}@depth{BOOK_DEPTH}@100ms", s) for s in symbols]
+    size = config.STREAMS_PER_CONNECTION
+    
+    threads = []
+    for i in range(0, len(streams), size):
+        thread = threading.Thread(
+            target=read_streams,
+            args=(dict(streams[i:i + size]),),
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    
+    return threads
+
+# ==================== SCANNER LOOP ====================
+async def scanner_loop(scanner, executor):
+    """Scan whenever orderbooks change, coalescing bursts of updates"""
+    if config.SCAN_CORE is not None:
+        # Run the parallel kernels inline so no Numba worker shares the pinned core
+        set_num_threads(1)
+    pin_current_thread(config.SCAN_CORE, "Scanner")
+    ob_changed.bind()
+    loop = asyncio.get_running_loop()
+    clock_task = asyncio.create_task(refresh_clock())  # Held so the task is not collected
+    
+    scan_count = 0
+    last_scan_time = 0
+    last_opportunity_time = 0
+    cycle_opportunity = None
+    
+    while True:
+        await ob_changed.event.wait()
+        
+        # Let a burst of updates land, and bound the scan rate
+        await asyncio.sleep(max(config.SCAN_COALESCE, config.SCAN_MIN_GAP - (loop.time() - last_scan_time)))
+        ob_changed.event.clear()
+        last_scan_time = loop.time()
+        scan_count += 1
+        
+        # Find best opportunity
+        dirty = orderbook.take_dirty()
+        orderbook.publish(dirty)
+        best_opportunity = None
+        best_profit = 0
+        
+        results = scanner.scan(config.TRADE_AMOUNT, dirty)
+        if len(results):
+            best = int(np.argmax(results))
+            if results[best] > config.TRADE_AMOUNT:
+                best_opportunity = scanner.simulate_triangle(best, config.TRADE_AMOUNT)
+                if best_opportunity:
+                    best_profit = best_opportunity['profit_pct']
+        
+        # Longer cycles from Bellman-Ford over top-of-book rates
+        if len(dirty):
+            cycle_opportunity = scanner.find_cycle(config.TRADE_AMOUNT)
+        if cycle_opportunity and cycle_opportunity['profit_pct'] > best_profit:
+            best_opportunity = cycle_opportunity
+            best_profit = cycle_opportunity['profit_pct']
         
-        # Wait before next round
-        time.sleep(0.5)
+        # Execute if profitable
+        if best_opportunity and best_profit >= config.MIN_PROFIT:
+            # Avoid executing too frequently
+            if time.time() - last_opportunity_time < 2:
+                continue
+                
+            last_opportunity_time = time.time()
+            executor.execute(best_opportunity)
+            
+            # Update console
+            log(f"\n📈 Scan #{scan_count}: Best profit = {best_profit:.2f}%")
+            
+        else:
+            # Show status
+            if scan_count % 10 == 0:
+                log(f"🔍 Scan #{scan_count}: No opportunities > {config.MIN_PROFIT}%")
 
 # ==================== MAIN BOT ====================
-def main():
-    """Main bot function"""
-    print("\n" + "="*50)
-    print("🔺 SIMPLE TRIANGULAR ARBITRAGE BOT")
-    print("="*50)
+def run_bot():
+    """Start every component and trade until interrupted"""
+    log("\n" + "="*50)
+    log("🔺 SIMPLE TRIANGULAR ARBITRAGE BOT")
+    log("="*50)
     
     # Initialize exchange
     exchange = init_exchange()
     
     # Load markets
-    print("📊 Loading markets...")
+    log("📊 Loading markets...")
     markets = exchange.load_markets()
     
     # Get USDT pairs
     symbols = [s for s in markets.keys() 
                if markets[s].get('active') and 'USDT' in s]
     symbols = symbols[:config.MAX_SYMBOLS]
-    print(f"✅ Loaded {len(symbols)} symbols")
+    log(f"✅ Loaded {len(symbols)} symbols")
     
     # Initialize scanner
-    scanner = TriangleScanner(exchange, markets)
-    scanner.triangles = scanner.find_triangles()
-    print(f"✅ Found {len(scanner.triangles)} triangles")
+    scanner = TriangleScanner(exchange, markets, symbols)
+    scanner.index_triangles(scanner.load_triangles())
+    orderbook.set_symbols(scanner.pairs)
+    log(f"✅ Found {len(scanner.triangles)} triangles")
     
-    # Initialize executor
-    executor = TradeExecutor(exchange)
+    log("⚙️ Compiling scan kernels...")
+    scanner.warm_up()
     
-    # Start orderbook updater in background
-    ob_thread = threading.Thread(
-        target=update_orderbooks,
-        args=(exchange, symbols),
-        daemon=True
-    )
-    ob_thread.start()
+    # Initialize executor, feeding trades to the dashboard process
+    ctx = multiprocessing.get_context('spawn')
+    dashboard_feed = ctx.Queue(maxsize=1000)
+    executor = TradeExecutor(exchange, dashboard_feed)
+    
+    # Seed the dashboard with the starting stats. The put also starts the
+    # queue's feeder thread now, before the scanner pins itself, so the
+    # feeder does not inherit SCAN_CORE or SCHED_FIFO
+    dashboard_feed.put_nowait((None, executor.stats.snapshot()))
+    
+    # Start orderbook streams in background
+    ob_threads = start_orderbook_streams(markets, scanner.pairs)
+    log(f"✅ Streaming {len(scanner.pairs)} orderbooks over {len(ob_threads)} connection(s)")
     
     # Wait for initial orderbook data
-    print("⏳ Waiting for orderbook data...")
+    log("⏳ Waiting for orderbook data...")
     time.sleep(3)
     
-    # Start web dashboard in background
-    print(f"🌐 Starting web dashboard on port {config.WEB_PORT}...")
-    web_thread = threading.Thread(
-        target=lambda: create_dashboard(executor, scanner).run(
-            host='0.0.0.0', 
-            port=config.WEB_PORT,
-            debug=False
-        ),
+    # Start web dashboard in its own process
+    log(f"🌐 Starting web dashboard on port {config.WEB_PORT}...")
+    web_process = ctx.Process(
+        target=run_dashboard,
+        args=(dashboard_feed, len(scanner.triangles)),
         daemon=True
     )
-    web_thread.start()
+    web_process.start()
     
-    print("\n🚀 Bot is running! Press Ctrl+C to stop")
-    print(f"📊 Dashboard: http://localhost:{config.WEB_PORT}")
-    print("="*50)
+    log("\n🚀 Bot is running! Press Ctrl+C to stop")
+    log(f"📊 Dashboard: http://localhost:{config.WEB_PORT}")
+    log("="*50)
     
     # Main trading loop
-    scan_count = 0
-    last_opportunity_time = 0
-    
     try:
-        while True:
-            scan_count += 1
-            
-            # Find best opportunity
-            best_opportunity = None
-            best_profit = 0
-            
-            for triangle in scanner.triangles:
-                result = scanner.simulate_triangle(triangle, config.TRADE_AMOUNT)
-                if result and result['profit_pct'] > best_profit:
-                    best_profit = result['profit_pct']
-                    best_opportunity = result
-            
-            # Execute if profitable
-            if best_opportunity and best_profit >= config.MIN_PROFIT:
-                # Avoid executing too frequently
-                if time.time() - last_opportunity_time < 2:
-                    continue
-                    
-                last_opportunity_time = time.time()
-                executor.execute(best_opportunity)
-                
-                # Update console
-                print(f"\n📈 Scan #{scan_count}: Best profit = {best_profit:.2f}%")
-                
-            else:
-                # Show status
-                if scan_count % 10 == 0:
-                    print(f"🔍 Scan #{scan_count}: No opportunities > {config.MIN_PROFIT}%")
-            
-            # Wait between scans
-            time.sleep(config.SCAN_INTERVAL)
-            
+        asyncio.run(scanner_loop(scanner, executor))
+        
     except KeyboardInterrupt:
-        print("\n\n🛑 Bot stopped by user")
-        print("\n📊 Final Stats:")
-        print(f"   Total Trades: {executor.stats['total_trades']}")
-        print(f"   Profitable: {executor.stats['profitable']}")
-        print(f"   Total Profit: ${executor.stats['total_profit']:.2f}")
-        print(f"   Best Trade: ${executor.stats['best_trade']:.2f}")
-        print("\n✅ Goodbye!")
+        log("\n\n🛑 Bot stopped by user")
+        log("\n📊 Final Stats:")
+        stats = executor.stats.snapshot()
+        log(f"   Total Trades: {stats['total_trades']}")
+        log(f"   Profitable: {stats['profitable']}")
+        log(f"   Total Profit: ${stats['total_profit']:.2f}")
+        log(f"   Best Trade: ${stats['best_trade']:.2f}")
+        log("\n✅ Goodbye!")
+
+def main():
+    """Main bot function"""
+    threading.Thread(target=log_writer, daemon=True).start()
+    try:
+        run_bot()
+    finally:
+        # Drain queued lines so startup errors and final stats reach the console
+        flush_log()
 
 if __name__ == "__main__":
     main()